@@ -0,0 +1,114 @@
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from storage import ArchiveStorage
+
+# Top level boxes every playable MP4 needs
+REQUIRED_BOXES = (b'ftyp', b'moov', b'mdat')
+
+
+def check_mp4(path: str, expected_size: int | None = None) -> str | None:
+    """
+    Checks a video for truncation by walking its top level MP4 boxes through mmap,
+    so only the box headers are read instead of the whole file.
+    :param path: The path of the video
+    :param expected_size: The size recorded when the video was downloaded, if known
+    :return: A description of the problem, or None if the video looks complete
+    """
+    try:
+        file_size = os.path.getsize(path)
+    except OSError as e:
+        return f"Unreadable: {e}"
+
+    if file_size == 0:
+        return "Empty file"
+
+    if expected_size and file_size != expected_size:
+        return f"Size mismatch: {file_size} of {expected_size} bytes"
+
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            found = set()
+            offset = 0
+            while offset < file_size:
+                if offset + 8 > file_size:
+                    return f"Truncated box header at byte {offset}"
+
+                box_size, box_type = struct.unpack_from('>I4s', data, offset)
+                header_size = 8
+                if box_size == 1:
+                    if offset + 16 > file_size:
+                        return f"Truncated box header at byte {offset}"
+                    box_size, = struct.unpack_from('>Q', data, offset + 8)
+                    header_size = 16
+                elif box_size == 0:
+                    box_size = file_size - offset  # The box runs to the end of the file
+
+                if box_size < header_size:
+                    return f"Invalid '{box_type.decode('latin-1')}' box size at byte {offset}"
+                if offset + box_size > file_size:
+                    return f"Truncated '{box_type.decode('latin-1')}' box: {file_size - offset} of {box_size} bytes"
+
+                if not found and box_type != b'ftyp':
+                    return "Missing 'ftyp' box at start of file"
+
+                found.add(box_type)
+                offset += box_size
+    except (OSError, ValueError) as e:
+        return f"Unreadable: {e}"
+
+    missing = [box.decode() for box in REQUIRED_BOXES if box not in found]
+    if missing:
+        return f"Missing {', '.join(repr(box) for box in missing)} box"
+
+    return None
+
+
+def _check_entry(entry: tuple[str, int | None]) -> str | None:
+    """Unpacks a (path, expected size) pair for the process pool."""
+    return check_mp4(*entry)
+
+
+def audit_archive(root: str, workers: int | None = None) -> tuple[int, list[dict]]:
+    """
+    Checks every video in an output folder, including sharded layouts, in a process pool.
+    Sizes and URLs recorded in the index are used when the video is in it, and index entries
+    whose file no longer exists are reported as missing or, if their download never finished, as incomplete.
+    :param root: The output folder to audit
+    :param workers: The number of worker processes, defaults to the number of CPUs
+    :return: The number of videos checked and a list of damaged videos with the keys 'id', 'path', 'url' and 'error'
+    """
+    storage = ArchiveStorage(root)
+    index = storage.load_index()
+    by_path = {os.path.normpath(entry['path']): entry for entry in index.values()}
+
+    videos = []
+    for directory, folders, files in os.walk(root):
+        folders[:] = [folder for folder in folders if not folder.startswith('.')]
+        for file_name in files:
+            if file_name.endswith('.mp4'):
+                path = os.path.join(directory, file_name)
+                videos.append((path, by_path.get(os.path.normpath(os.path.relpath(path, root)))))
+
+    entries = [(path, entry.get('size') if entry else None) for path, entry in videos]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        errors = list(executor.map(_check_entry, entries, chunksize=64))
+
+    damaged = []
+    for (path, entry), error in zip(videos, errors):
+        if error:
+            damaged.append({'id': entry['id'] if entry else os.path.splitext(os.path.basename(path))[0],
+                            'path': path, 'url': entry['url'] if entry else None, 'error': error})
+
+    # Videos in the index whose file was deleted or lost in a move or backup
+    found = {os.path.normpath(os.path.relpath(path, root)) for path, _ in videos}
+    missing = [entry for entry in index.values() if os.path.normpath(entry['path']) not in found
+               and not os.path.exists(os.path.join(root, entry['path']))]
+    for entry in missing:
+        error = "Download never completed" if entry.get('pending') else "Missing file"
+        damaged.append({'id': entry['id'], 'path': os.path.join(root, entry['path']), 'url': entry['url'],
+                        'error': error})
+
+    return len(videos) + len(missing), damaged
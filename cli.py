@@ -2,7 +2,7 @@ import argparse
 from datetime import datetime
 
 from arg_types import dir_type
-from models import TikTokActivityType
+from models import OutputLayout, SchedulePolicy, SyncPolicy, TikTokActivityType
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -27,6 +27,62 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument("-c", "--chunk-size", type=int, metavar="CHUNK_SIZE", help="The write speed of each download",
                         default=1024)
 
+    parser.add_argument("--schedule", choices=SchedulePolicy.get_all_types(), metavar="POLICY",
+                        default=SchedulePolicy.FIFO.value,
+                        help=("The order in which videos are downloaded:\n"
+                              "  fifo     = input order (default)\n"
+                              "  shortest = smallest videos first, sizes are probed ahead of time\n"
+                              "  fair     = alternate between authors, smallest first per author"))
+
+    parser.add_argument("--bandwidth-limit", type=int, metavar="BYTES_PER_SECOND",
+                        help="Cap the total download rate in bytes per second")
+
+    parser.add_argument("--layout", choices=OutputLayout.get_all_types(), metavar="LAYOUT",
+                        default=OutputLayout.FLAT.value,
+                        help=("Directory layout of the output folder:\n"
+                              "  flat        = every video in the output folder (default)\n"
+                              "  hashed      = two levels of hash-sharded folders, e.g. 3f/a2/\n"
+                              "  author-date = one folder per author and month, e.g. username/2024-05/\n"
+                              "Every layout keeps a .tiktock-index.jsonl mapping video IDs to paths"))
+
+    parser.add_argument("--sync", choices=SyncPolicy.get_all_types(), metavar="SYNC_POLICY",
+                        default=SyncPolicy.NONE.value,
+                        help=("How often videos are flushed to disk:\n"
+                              "  none  = leave it to the operating system (default)\n"
+                              "  file  = fsync every video as it finishes\n"
+                              "  batch = fsync every --sync-batch videos"))
+
+    parser.add_argument("--sync-batch", type=int, metavar="COUNT", default=100,
+                        help="The number of videos per fsync when using --sync batch")
+
+    parser.add_argument("--proxy", action="append", metavar="PROXY_URL", default=[],
+                        help=("Send traffic through a proxy, repeat to spread downloads over several routes.\n"
+                              "Supports http://, https:// and, with requests[socks] installed, socks5:// URLs"))
+
+    parser.add_argument("--source-address", action="append", metavar="IP_ADDRESS", default=[],
+                        help="Bind outgoing connections to a local address, repeat to add more routes")
+
+    parser.add_argument("--url-cache", type=str, metavar="FILE_NAME",
+                        help=("Keep resolved video URLs in a JSON file until they expire, so re-runs\n"
+                              "skip fetching the video page"))
+
+    parser.add_argument("--retries", type=int, metavar="RETRIES", default=0,
+                        help="How many times a download that failed with a network error, a 429 or 5xx "
+                             "response or a cut off transfer is retried, waiting longer after every attempt")
+
+    parser.add_argument("--profile", metavar="FILE_NAME", nargs="?",
+                        const=f"{datetime.now().strftime('[tiktock] %Y-%m-%d_%H-%M_profile.prof')}",
+                        help="Profile the run with cProfile, print a hot path report and save the raw stats")
+
+    parser.add_argument("--audit", type=argparse.FileType('w'), metavar="FILE_NAME", nargs="?",
+                        const=f"{datetime.now().strftime('[tiktock] %Y-%m-%d_%H-%M_damaged.txt')}",
+                        help=("Check the videos in the output folder for truncated or corrupt files instead of\n"
+                              "downloading, and save the URLs of damaged videos to a text file that can be\n"
+                              "passed back to --recursive"))
+
+    parser.add_argument("--audit-workers", type=int, metavar="WORKERS",
+                        help="The number of processes used by --audit (default: number of CPUs)")
+
     parser.add_argument("--activity", nargs="+", choices=TikTokActivityType.get_all_types(), metavar="TIKTOK_ACTIVITY",
                         help="Pre select an activity", default=[])
 
@@ -22,15 +22,30 @@ class DisplayManager:
         self.console.print(table)
         print()
 
-    def show_summary(self, completed: list, failed: list) -> None:
+    def show_summary(self, completed: list, failed: list, completion_times: dict | None = None) -> None:
         """Display the final download summary."""
         print()
         self.console.print(self._create_summary_panel(completed, failed))
+        if completion_times:
+            self.console.print(self._create_timing_table(completion_times))
         if failed:
             self.console.print("\n[bold]Details of Failed Downloads:[/]")
             self.console.print(self._create_failed_table(failed))
             self.console.print(f"[bold]Total[/]: {len(failed)} videos failed\n")
 
+    def show_route_stats(self, routes: list[dict]) -> None:
+        """Display the per route request statistics."""
+        self.console.print(self._create_route_table(routes))
+        print()
+
+    def show_audit(self, checked: int, damaged: list[dict]) -> None:
+        """Display the result of an archive integrity audit."""
+        print()
+        if damaged:
+            self.console.print(self._create_damaged_table(damaged))
+        self.console.print(f"[bold]Checked[/]: {checked} videos, "
+                           f"[{'red' if damaged else 'green'}]{len(damaged)} damaged[/]\n")
+
     @staticmethod
     def format_size(size_in_bytes: int) -> str:
         """
@@ -94,6 +109,52 @@ class DisplayManager:
             padding=(1, 2)
         )
 
+    @staticmethod
+    def _create_timing_table(completion_times: dict) -> Table:
+        """Generate the completion time statistics table."""
+        table = Table(title="Completion Times", show_header=True, header_style="bold", expand=True)
+        for label in ("Mean", "P50", "P95", "Max"):
+            table.add_column(label, justify="center")
+
+        table.add_row(*(f"{completion_times[key]:.2f}s" for key in ("mean", "p50", "p95", "max")))
+
+        return table
+
+    @staticmethod
+    def _create_route_table(routes: list[dict]) -> Table:
+        """Generate the per route statistics table."""
+        table = Table(title="Egress Routes", show_header=True, header_style="bold", expand=True)
+        table.add_column("Route", style="bold")
+        table.add_column("Requests", justify="right")
+        table.add_column("Errors", justify="right")
+        table.add_column("Latency", justify="right")
+        table.add_column("Throughput", justify="right")
+        table.add_column("Received", justify="right")
+        table.add_column("Status", justify="center")
+
+        for route in routes:
+            latency = f"{route['latency'] * 1000:.0f} ms" if route['latency'] is not None else "-"
+            throughput = f"{DisplayManager.format_size(int(route['throughput']))}/s" if route['throughput'] else "-"
+            status = "[red]ejected[/]" if route['ejected'] else "[green]healthy[/]"
+            table.add_row(route['name'], str(route['requests']), f"{route['error_rate']:.0%}", latency, throughput,
+                          DisplayManager.format_size(route['bytes']), status)
+
+        return table
+
+    @staticmethod
+    def _create_damaged_table(damaged: list[dict]) -> Table:
+        """Generate the damaged videos table of an audit."""
+        table = Table(show_header=True, header_style="bold")
+        table.add_column("#", style="cyan", justify="right")
+        table.add_column("Video ID", style="bold")
+        table.add_column("Path")
+        table.add_column("Error", style="red")
+
+        for i, video in enumerate(damaged, 1):
+            table.add_row(str(i), video['id'], video['path'], video['error'])
+
+        return table
+
     @staticmethod
     def _create_failed_table(failed: list) -> Table:
         """Generate detailed failed downloads table."""
@@ -1,7 +1,12 @@
 import json
-import os.path
+import time
 
 from display import DisplayManager
+from hooks import DownloadEvent
+from models import OutputLayout, SchedulePolicy, SyncPolicy
+from routes import EgressRoute
+from scheduler import BandwidthLimiter, DownloadScheduler, completion_stats, retry_backoff
+from storage import ArchiveStorage
 from tiktok_downloader import TikTokDownloader
 from tiktok_helpers import extract_video_id
 from utils import parse_filename_template
@@ -15,7 +20,10 @@ class DownloadManager:
         self.tiktok_downloader = tiktok_downloader
 
     def download(self, urls: list[str], output_path: str, delay: int, chunk_size: int,
-                 log_handler: object | None = None, filename_template: str | None = None) -> None:
+                 log_handler: object | None = None, filename_template: str | None = None,
+                 schedule_policy: SchedulePolicy = SchedulePolicy.FIFO, bandwidth_limit: int | None = None,
+                 layout: OutputLayout = OutputLayout.FLAT, sync_policy: SyncPolicy = SyncPolicy.NONE,
+                 sync_batch: int = 100, retries: int = 0) -> None:
         """
         Downloads a list of videos with the progress bar with status information and a summary
         :param urls: The URLs to download
@@ -24,51 +32,108 @@ class DownloadManager:
         :param chunk_size: The chunk size write speed
         :param log_handler: If provided writes a log file of the completed and failed downloads
         :param filename_template: Template to design the file name
+        :param schedule_policy: The order in which the videos are downloaded
+        :param bandwidth_limit: If provided caps the download rate in bytes per second
+        :param layout: The directory layout of the output folder
+        :param sync_policy: How often the downloaded videos are flushed to disk
+        :param sync_batch: The number of videos per fsync batch when using the batch sync policy
+        :param retries: How many times a download that failed with a transient error is retried
         :return: None
         """
         data = {"total": len(urls), "output": output_path, "delay": delay, "chunk_size": chunk_size,
                 "filename_template": filename_template if filename_template else "None",
+                "schedule": schedule_policy.value, "bandwidth_limit": bandwidth_limit,
+                "layout": layout.value, "sync": sync_policy.value, "retries": retries,
                 "completed": [], "failed": []}
         completed = data["completed"]
         failed = data["failed"]
+        completion_times = []
+        rate_limiter = BandwidthLimiter(bandwidth_limit) if bandwidth_limit else None
+        scheduler = DownloadScheduler(self.tiktok_downloader, schedule_policy)
+        storage = ArchiveStorage(output_path, layout, sync_policy, sync_batch)
+        hooks = self.tiktok_downloader.hooks
         try:
-            for i, url in enumerate(urls, start=1):
+            # Start the clock before probing so policies that probe pay for it in their completion times
+            start = time.monotonic()
+            if schedule_policy != SchedulePolicy.FIFO:
+                with self.display_manager.console.status("Probing video sizes..."):
+                    jobs = scheduler.plan(urls, delay)
+            else:
+                jobs = scheduler.plan(urls, delay)
+
+            if hooks.has(DownloadEvent.QUEUED):
+                for position, job in enumerate(jobs, start=1):
+                    hooks.emit(DownloadEvent.QUEUED, url=job['url'], index=job['index'], position=position,
+                               size=job['size'])
+
+            for position, job in enumerate(jobs, start=1):
+                url = job['url']
                 try:
-                    file_name = parse_filename_template(i, url, filename_template) if filename_template else None
+                    file_name = parse_filename_template(job['index'], url, filename_template,
+                                                        self.tiktok_downloader.get_author(url)) \
+                        if filename_template else None
                 except ValueError:
                     self.display_manager.console.print("\n[bold red]Error parsing filename template[/]")
                     quit(1)
 
-                response = self._download_video(url, output_path, delay, chunk_size, i, len(urls),
-                                                file_name=file_name)
+                video_id = extract_video_id(url)
+                author = job['author'] or (self.tiktok_downloader.get_author(url)
+                                           if layout == OutputLayout.AUTHOR_DATE else None)
+                output_file = storage.path_for(video_id, file_name, author)
+
+                storage.begin(video_id, output_file, url)
+                video_url, route = job['video_url'], job['route']
+                for attempt in range(retries + 1):
+                    response = self._download_video(url, output_file, delay, chunk_size, position, len(jobs),
+                                                    video_url=video_url, rate_limiter=rate_limiter,
+                                                    fsync=sync_policy == SyncPolicy.FILE, route=route)
+                    # Permanent failures such as image posts or 404 pages fail the same way every time
+                    if response['success'] or not response.get('retryable') or attempt == retries:
+                        break
+                    # Go through the URL cache on retry, it falls back to resolving the page if the URL is rejected,
+                    # and let the pool pick a route again in case the pinned one was the problem
+                    video_url, route = None, None
+                    hooks.emit(DownloadEvent.RETRIED, url=url, attempt=attempt + 1, error=response.get('error'))
+                    time.sleep(retry_backoff(delay, attempt))
+
+                completion_times.append(time.monotonic() - start)
                 self.display_manager.show_response_table(response)
                 if response['success']:
+                    storage.record(video_id, output_file, url, response['size'])
                     completed.append(url)
                 else:
                     failed.append((url, response.get('error', 'Unknown error')))
         except KeyboardInterrupt:
             self.display_manager.console.print("\n[bold yellow]Download interrupted[/]")
+        finally:
+            storage.close()
 
-        self.display_manager.show_summary(completed, failed)
+        data["completion_times"] = completion_stats(completion_times)
+        data["routes"] = self.tiktok_downloader.route_pool.stats()
+        self.display_manager.show_summary(completed, failed, data["completion_times"])
+        if len(data["routes"]) > 1:
+            self.display_manager.show_route_stats(data["routes"])
 
         if log_handler:
             json.dump(data, log_handler, indent=4)
 
-    def _download_video(self, url: str, output_path: str, delay: int, chunk_size: int, index: int, total: int,
-                        file_name: str | None = None) -> dict:
+    def _download_video(self, url: str, output_file: str, delay: int, chunk_size: int, index: int, total: int,
+                        video_url: str | None = None, rate_limiter: BandwidthLimiter | None = None,
+                        fsync: bool = False, route: EgressRoute | None = None) -> dict:
         """
         Downloads a video with the display managers progress bar
         :param url: The url to download
-        :param output_path: The folder in which the file will be stored
+        :param output_file: The path the video will be written to
         :param delay: The delay before starting the download
         :param chunk_size: The writing speed of the transfer
         :param index: The current index of the download
         :param total: The total amount of downloads
+        :param video_url: An already resolved video download URL
+        :param rate_limiter: The bandwidth limiter shared between transfers
+        :param fsync: Flush the video to disk before returning
+        :param route: The route pinned to the video while probing
         :return: Response dictionary
         """
-        file_name = str(file_name) if file_name else extract_video_id(url)
-        output_file = os.path.join(output_path, f"{file_name}.mp4")
-
         with self.display_manager.show_progress() as progress:
             task = progress.add_task("download", filename=f"{index} of {total}")
 
@@ -76,5 +141,7 @@ class DownloadManager:
                 progress.update(task, completed=(downloaded / total_bytes) * 100)
 
             response = self.tiktok_downloader.download(url, output_file, on_progress=update_progress, delay=delay,
-                                                       chunk_size=chunk_size)
+                                                       chunk_size=chunk_size, video_url=video_url,
+                                                       rate_limiter=rate_limiter, preallocate_file=True, fsync=fsync,
+                                                       route=route)
             return response
@@ -0,0 +1,77 @@
+import time
+import warnings
+from enum import Enum
+from typing import Callable
+
+
+class DownloadEvent(Enum):
+    """Events emitted during the lifecycle of a download."""
+    QUEUED = "queued"
+    PAGE_RESOLVED = "page-resolved"
+    FIRST_BYTE = "first-byte"
+    CHUNK_BATCH = "chunk-batch"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    RETRIED = "retried"
+
+
+class HookRegistry:
+    """
+    Keeps the callbacks registered for each download event and dispatches events to them.
+    Every callback receives a single dictionary with the 'event' and a monotonic 'time'
+    plus the fields of the event, such as 'url', 'bytes' or 'error'.
+    """
+
+    def __init__(self, chunk_batch_size: int = 64):
+        """
+        :param chunk_batch_size: The number of chunks between two CHUNK_BATCH events
+        """
+        self.chunk_batch_size = max(1, chunk_batch_size)
+        self._hooks: dict[DownloadEvent, list[Callable[[dict], None]]] = {}
+
+    def register(self, event: DownloadEvent, callback: Callable[[dict], None]) -> None:
+        """
+        Registers a callback for an event.
+        :param event: The event to listen to
+        :param callback: Called with the event dictionary every time the event is emitted
+        """
+        self._hooks.setdefault(event, []).append(callback)
+
+    def unregister(self, event: DownloadEvent, callback: Callable[[dict], None]) -> None:
+        """
+        Removes a previously registered callback, does nothing if it was not registered.
+        :param event: The event the callback listens to
+        :param callback: The callback to remove
+        """
+        callbacks = self._hooks.get(event)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._hooks[event]
+
+    def has(self, event: DownloadEvent) -> bool:
+        """
+        Checks whether anything listens to an event, so hot paths can skip building its fields.
+        :param event: The event to check
+        :return: True if at least one callback is registered for the event
+        """
+        return event in self._hooks
+
+    def emit(self, event: DownloadEvent, **fields) -> None:
+        """
+        Dispatches an event to its callbacks.
+        A callback that raises is reported as a RuntimeWarning and never changes the outcome of the download.
+        :param event: The event to emit
+        :param fields: The fields of the event
+        """
+        callbacks = self._hooks.get(event)
+        if not callbacks:
+            return
+
+        payload = {'event': event, 'time': time.monotonic(), **fields}
+        for callback in list(callbacks):
+            try:
+                callback(payload)
+            except Exception as e:
+                warnings.warn(f"Hook {callback!r} failed on the '{event.value}' event: {e!r}", RuntimeWarning,
+                              stacklevel=2)
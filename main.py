@@ -1,12 +1,18 @@
 from rich.panel import Panel
 from rich.table import Table
+from rich.text import Text
 
+from audit import audit_archive
 from cli import create_parser
 from display import DisplayManager
 from download_manager import DownloadManager
 from extractors import URLExtractor
+from models import OutputLayout, SchedulePolicy, SyncPolicy
+from profiling import run_profiled
+from routes import build_route_pool
 from tiktok_downloader import TikTokDownloader
 from tiktok_helpers import is_valid_url
+from url_cache import ResolvedURLCache
 
 
 def main() -> None:
@@ -16,10 +22,21 @@ def main() -> None:
     parser = create_parser()
     args = parser.parse_args()
 
+    try:
+        route_pool = build_route_pool(args.proxy, args.source_address)
+    except ValueError as e:
+        parser.error(str(e))
+
     display = DisplayManager()
-    tiktok_downloader = TikTokDownloader()
+    tiktok_downloader = TikTokDownloader(url_cache=ResolvedURLCache(path=args.url_cache), route_pool=route_pool)
     download_manager = DownloadManager(display_manager=display, tiktok_downloader=tiktok_downloader)
 
+    if args.audit:
+        if args.audit_workers is not None and args.audit_workers <= 0:
+            parser.error("--audit-workers must be a positive number of processes.")
+        audit(display, args)
+        return
+
     urls = []
 
     # Collect URLs from command line
@@ -50,6 +67,15 @@ def main() -> None:
     if not valid_urls:
         parser.error("No valid TikTok URLs to download.")
 
+    if args.bandwidth_limit is not None and args.bandwidth_limit <= 0:
+        parser.error("--bandwidth-limit must be a positive number of bytes per second.")
+
+    if args.sync_batch <= 0:
+        parser.error("--sync-batch must be a positive number of videos.")
+
+    if args.retries < 0:
+        parser.error("--retries must not be negative.")
+
     # Display summary
     summary_table = Table.grid(padding=(0, 2))
     summary_table.add_column(no_wrap=True)
@@ -64,14 +90,52 @@ def main() -> None:
     display.console.print()
 
     # Download all valid URLs
-    download_manager.download(
-        valid_urls,
-        args.output,
-        args.delay,
-        args.chunk_size,
-        log_handler=args.log,
-        filename_template=args.name_template
-    )
+    def run() -> None:
+        download_manager.download(
+            valid_urls,
+            args.output,
+            args.delay,
+            args.chunk_size,
+            log_handler=args.log,
+            filename_template=args.name_template,
+            schedule_policy=SchedulePolicy.from_string(args.schedule),
+            bandwidth_limit=args.bandwidth_limit,
+            layout=OutputLayout.from_string(args.layout),
+            sync_policy=SyncPolicy.from_string(args.sync),
+            sync_batch=args.sync_batch,
+            retries=args.retries
+        )
+
+    try:
+        if args.profile:
+            report = run_profiled(run, args.profile)
+            display.console.print(Panel(Text(report), title="Profile", expand=True))
+            display.console.print(f"[bold]Profile saved to[/]: {args.profile}")
+        else:
+            run()
+    finally:
+        tiktok_downloader.url_cache.save()
+
+
+def audit(display: DisplayManager, args) -> None:
+    """
+    Audits the output folder and writes the URLs of the damaged videos for a targeted re-download.
+    :param display: The display manager
+    :param args: Parser arguments
+    """
+    with display.console.status(f"Auditing {args.output}..."):
+        checked, damaged = audit_archive(args.output, args.audit_workers)
+
+    display.show_audit(checked, damaged)
+
+    urls = [video['url'] for video in damaged if video['url']]
+    args.audit.writelines(f"{url}\n" for url in urls)
+    args.audit.close()
+
+    display.console.print(f"[bold]Saved {len(urls)} URLs to re-download to[/]: {args.audit.name}")
+    if len(urls) < len(damaged):
+        display.console.print(f"[yellow]{len(damaged) - len(urls)} damaged videos are not in the index "
+                              f"and have no known URL[/]")
 
 
 if __name__ == "__main__":
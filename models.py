@@ -18,3 +18,63 @@ class TikTokActivityType(Enum):
             return cls(value)
         except ValueError:
             raise ValueError(f"Invalid activity type: {value}")
+
+
+class SchedulePolicy(Enum):
+    """Orderings the download scheduler can apply to the queue."""
+    FIFO = "fifo"
+    SHORTEST = "shortest"
+    FAIR = "fair"
+
+    @classmethod
+    def get_all_types(cls) -> list[str]:
+        """Returns a list of all schedule policy values."""
+        return [policy.value for policy in cls]
+
+    @classmethod
+    def from_string(cls, value: str) -> 'SchedulePolicy':
+        """Converts a string to a SchedulePolicy enum."""
+        try:
+            return cls(value)
+        except ValueError:
+            raise ValueError(f"Invalid schedule policy: {value}")
+
+
+class OutputLayout(Enum):
+    """Directory layouts for the downloaded videos."""
+    FLAT = "flat"
+    HASHED = "hashed"
+    AUTHOR_DATE = "author-date"
+
+    @classmethod
+    def get_all_types(cls) -> list[str]:
+        """Returns a list of all output layout values."""
+        return [layout.value for layout in cls]
+
+    @classmethod
+    def from_string(cls, value: str) -> 'OutputLayout':
+        """Converts a string to an OutputLayout enum."""
+        try:
+            return cls(value)
+        except ValueError:
+            raise ValueError(f"Invalid output layout: {value}")
+
+
+class SyncPolicy(Enum):
+    """How often downloaded videos are flushed to disk with fsync."""
+    NONE = "none"
+    FILE = "file"
+    BATCH = "batch"
+
+    @classmethod
+    def get_all_types(cls) -> list[str]:
+        """Returns a list of all sync policy values."""
+        return [policy.value for policy in cls]
+
+    @classmethod
+    def from_string(cls, value: str) -> 'SyncPolicy':
+        """Converts a string to a SyncPolicy enum."""
+        try:
+            return cls(value)
+        except ValueError:
+            raise ValueError(f"Invalid sync policy: {value}")
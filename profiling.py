@@ -0,0 +1,26 @@
+import cProfile
+import io
+import pstats
+from typing import Callable
+
+
+def run_profiled(func: Callable[[], None], output_file: str | None = None, limit: int = 25) -> str:
+    """
+    Runs a function under cProfile and builds a report of its hot paths.
+    :param func: The function to profile
+    :param output_file: If provided the raw stats are dumped there, even if the function raises
+    :param limit: The number of functions to include in the report
+    :return: The report of the most expensive functions sorted by cumulative and internal time
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(func)
+    finally:
+        if output_file:
+            profiler.dump_stats(output_file)
+
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report).strip_dirs()
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+    return report.getvalue()
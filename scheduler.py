@@ -0,0 +1,122 @@
+import threading
+import time
+from itertools import zip_longest
+from typing import TYPE_CHECKING
+
+from models import SchedulePolicy
+
+if TYPE_CHECKING:
+    from tiktok_downloader import TikTokDownloader
+
+
+class BandwidthLimiter:
+    """Token bucket that caps the combined download rate of every transfer sharing it."""
+
+    def __init__(self, bytes_per_second: int):
+        if bytes_per_second <= 0:
+            raise ValueError("Bandwidth limit must be a positive number of bytes per second")
+        self.bytes_per_second = bytes_per_second
+        self._tokens = float(bytes_per_second)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        """
+        Blocks until `amount` bytes may be transferred without exceeding the limit.
+        :param amount: The number of bytes that were just transferred
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.bytes_per_second),
+                               self._tokens + (now - self._last_refill) * self.bytes_per_second)
+            self._last_refill = now
+            # Go into debt so chunks larger than the bucket still pass, then wait it off
+            self._tokens -= amount
+            wait = -self._tokens / self.bytes_per_second if self._tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+
+class DownloadScheduler:
+    """Orders the download queue, probing video sizes ahead of time when the policy needs them."""
+
+    def __init__(self, tiktok_downloader: 'TikTokDownloader', policy: SchedulePolicy = SchedulePolicy.FIFO):
+        self.tiktok_downloader = tiktok_downloader
+        self.policy = policy
+
+    def plan(self, urls: list[str], delay: float = 0) -> list[dict]:
+        """
+        Builds the ordered list of jobs for the given URLs.
+        Every job keeps its original 1-based `index` so filename templates do not depend on the order.
+        :param urls: The URLs to download
+        :param delay: The delay in seconds before each probe, so probing does not burst requests at TikTok
+        :return: A list of job dictionaries with the keys 'index', 'url', 'author', 'video_url', 'size' and 'route'
+        """
+        jobs = [{'index': i, 'url': url, 'author': None, 'video_url': None, 'size': None, 'route': None}
+                for i, url in enumerate(urls, start=1)]
+
+        if self.policy == SchedulePolicy.FIFO:
+            return jobs
+
+        for job in jobs:
+            time.sleep(delay)
+            job.update(self.tiktok_downloader.probe(job['url']))
+            if self.policy == SchedulePolicy.FAIR:
+                job['author'] = self.tiktok_downloader.get_author(job['url'], job['route'])
+
+        return self.order(jobs, self.policy)
+
+    @staticmethod
+    def order(jobs: list[dict], policy: SchedulePolicy) -> list[dict]:
+        """
+        Orders probed jobs according to the policy.
+        SHORTEST runs the smallest videos first, which minimizes the mean completion time.
+        FAIR alternates between authors so no single author holds back the rest of the queue.
+        Jobs with an unknown size are kept in input order after the ones with a known size.
+        :param jobs: The probed jobs
+        :param policy: The schedule policy
+        :return: The ordered jobs
+        """
+        def by_size(job: dict) -> tuple:
+            return job['size'] is None, job['size'] or 0, job['index']
+
+        if policy == SchedulePolicy.SHORTEST:
+            return sorted(jobs, key=by_size)
+
+        if policy == SchedulePolicy.FAIR:
+            per_author = {}
+            for job in sorted(jobs, key=by_size):
+                per_author.setdefault(job['author'], []).append(job)
+            return [job for batch in zip_longest(*per_author.values()) for job in batch if job is not None]
+
+        return list(jobs)
+
+
+def retry_backoff(delay: float, attempt: int, max_backoff: float = 60) -> float:
+    """
+    Gets how long to wait before retrying a failed download, doubling with every attempt.
+    :param delay: The delay between downloads, the first retry waits at least a second
+    :param attempt: The number of the failed attempt, starting at 0
+    :param max_backoff: The longest wait in seconds
+    :return: The seconds to wait
+    """
+    return min(max_backoff, max(delay, 1) * 2 ** attempt)
+
+
+def completion_stats(completion_times: list[float]) -> dict[str, float]:
+    """
+    Summarizes the completion times of a run.
+    :param completion_times: Seconds from the start of the run until each download finished
+    :return: A dictionary with the 'mean', 'p50', 'p95' and 'max' completion times in seconds
+    """
+    if not completion_times:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+    ordered = sorted(completion_times)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {'mean': sum(ordered) / len(ordered), 'p50': percentile(0.5), 'p95': percentile(0.95),
+            'max': ordered[-1]}
@@ -0,0 +1,174 @@
+import datetime
+import hashlib
+import json
+import os
+from typing import BinaryIO
+
+from models import OutputLayout, SyncPolicy
+
+INDEX_FILE_NAME = ".tiktock-index.jsonl"
+
+# TikTok video IDs carry their creation time in the upper 32 bits, anything before 2016 is not a real timestamp
+_MIN_VIDEO_TIMESTAMP = 1451606400
+
+
+def video_date(video_id: str) -> datetime.datetime:
+    """
+    Gets the creation date encoded in a TikTok video ID.
+    :param video_id: The TikTok video ID
+    :return: The creation date, or the current date if the ID does not encode one
+    """
+    try:
+        timestamp = int(video_id) >> 32
+    except ValueError:
+        timestamp = 0
+
+    if timestamp < _MIN_VIDEO_TIMESTAMP:
+        return datetime.datetime.now()
+    return datetime.datetime.fromtimestamp(timestamp)
+
+
+def preallocate(file_handler: BinaryIO, size: int) -> bool:
+    """
+    Reserves `size` bytes for the file up front so it is not fragmented while it grows chunk by chunk.
+    :param file_handler: The file handler opened for writing
+    :param size: The expected size of the file in bytes
+    :return: True if the space was reserved, False if the platform or file system does not support it
+    """
+    if not size or not hasattr(os, "posix_fallocate"):
+        return False
+
+    try:
+        os.posix_fallocate(file_handler.fileno(), 0, size)
+    except OSError:
+        return False
+    return True
+
+
+def fsync_directory(path: str) -> None:
+    """
+    Flushes a directory entry to disk so a file renamed into it survives a power loss.
+    Does nothing on platforms that cannot open directories, such as Windows.
+    :param path: The directory to flush
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ArchiveStorage:
+    """Decides where videos are stored, keeps the video ID index and applies the sync policy."""
+
+    def __init__(self, root: str, layout: OutputLayout = OutputLayout.FLAT,
+                 sync_policy: SyncPolicy = SyncPolicy.NONE, sync_batch: int = 100):
+        self.root = root
+        self.layout = layout
+        self.sync_policy = sync_policy
+        self.sync_batch = max(1, sync_batch)
+        self.index_path = os.path.join(root, INDEX_FILE_NAME)
+        self._index_handler = None
+        self._pending_sync = []
+
+    def path_for(self, video_id: str, file_name: str | None = None, author: str | None = None) -> str:
+        """
+        Builds the output path of a video, creating its shard directory if needed.
+        :param video_id: The TikTok video ID
+        :param file_name: The file name without extension, defaults to the video ID
+        :param author: The video author, used by the author-date layout
+        :return: The path the video should be written to
+        """
+        file_name = f"{file_name or video_id}.mp4"
+
+        if self.layout == OutputLayout.HASHED:
+            digest = hashlib.sha1(video_id.encode()).hexdigest()
+            directory = os.path.join(self.root, digest[:2], digest[2:4])
+        elif self.layout == OutputLayout.AUTHOR_DATE:
+            directory = os.path.join(self.root, author or "Unknown", video_date(video_id).strftime("%Y-%m"))
+        else:
+            return os.path.join(self.root, file_name)
+
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, file_name)
+
+    def load_index(self) -> dict[str, dict]:
+        """
+        Reads the index file, later entries for the same video ID replace earlier ones.
+        :return: A dictionary of video ID to its index entry
+        """
+        index = {}
+        if not os.path.exists(self.index_path):
+            return index
+
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A torn last line from an interrupted run
+                index[entry["id"]] = entry
+        return index
+
+    def begin(self, video_id: str, path: str, url: str) -> None:
+        """
+        Appends a pending entry to the index before a download starts, so the audit knows the URL of a video
+        whose download failed or was killed and never reached its final path.
+        :param video_id: The TikTok video ID
+        :param path: The path the video will be written to
+        :param url: The URL the video is downloaded from
+        """
+        self._append({"id": video_id, "path": os.path.relpath(path, self.root), "url": url, "size": None,
+                      "pending": True})
+
+    def record(self, video_id: str, path: str, url: str, size: int) -> None:
+        """
+        Appends a finished download to the index and applies the sync policy.
+        :param video_id: The TikTok video ID
+        :param path: The path the video was written to
+        :param url: The URL the video was downloaded from
+        :param size: The size of the video in bytes as reported by the server
+        """
+        self._append({"id": video_id, "path": os.path.relpath(path, self.root), "url": url, "size": size})
+
+        if self.sync_policy == SyncPolicy.FILE:
+            os.fsync(self._index_handler.fileno())
+        elif self.sync_policy == SyncPolicy.BATCH:
+            self._pending_sync.append(path)
+            if len(self._pending_sync) >= self.sync_batch:
+                self.sync()
+
+    def _append(self, entry: dict) -> None:
+        """Writes an entry to the index file, opening it on first use."""
+        if self._index_handler is None:
+            self._index_handler = open(self.index_path, "a", encoding="utf-8")
+
+        self._index_handler.write(json.dumps(entry) + "\n")
+        self._index_handler.flush()
+
+    def sync(self) -> None:
+        """Flushes the videos waiting for a batched fsync and the index to disk."""
+        for path in self._pending_sync:
+            try:
+                with open(path, "rb") as f:
+                    os.fsync(f.fileno())
+            except OSError:
+                pass  # The file was removed or is unreadable, nothing left to make durable
+        self._pending_sync.clear()
+
+        if self._index_handler is not None:
+            os.fsync(self._index_handler.fileno())
+
+    def close(self) -> None:
+        """Syncs any pending videos and closes the index file."""
+        if self.sync_policy == SyncPolicy.BATCH:
+            self.sync()
+
+        if self._index_handler is not None:
+            self._index_handler.close()
+            self._index_handler = None
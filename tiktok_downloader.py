@@ -1,16 +1,29 @@
+import os
 import re
 import time
 from typing import Callable
 
 import requests
 
-from tiktok_helpers import extract_video_author
+from hooks import DownloadEvent, HookRegistry
+from routes import EgressRoute, RoutePool
+from scheduler import BandwidthLimiter
+from storage import fsync_directory, preallocate
+from tiktok_helpers import extract_video_author, extract_video_id
+from url_cache import ResolvedURLCache
+
+
+class IncompleteDownloadError(Exception):
+    """The connection closed before the whole video arrived."""
 
 
 class TikTokDownloader:
     """Handles all TikTok related things such as downloading videos."""
 
-    def __init__(self):
+    def __init__(self, hooks: HookRegistry | None = None, url_cache: ResolvedURLCache | None = None,
+                 route_pool: RoutePool | None = None):
+        self.hooks = hooks or HookRegistry()
+        self.url_cache = url_cache or ResolvedURLCache()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -18,15 +31,57 @@ class TikTokDownloader:
             'Referer': 'https://www.tiktok.com/'
         }
         self.session = requests.Session()
+        self.route_pool = route_pool or RoutePool([EgressRoute("direct", session=self.session)])
+
+    def _request(self, method: str, url: str, route: EgressRoute | None = None,
+                 **kwargs) -> tuple[requests.Response, EgressRoute, float]:
+        """
+        Sends a request through a route and records its health.
+        Connection errors, 429 and 5xx responses count against the route, other error statuses are the URL's fault.
+        A request that could not connect sent nothing, so it is sent again through the other healthy routes in turn.
+        Streamed responses are only recorded when they fail here, the caller records them once the body arrived.
+
+        :param method: The HTTP method.
+        :param url: The URL to request.
+        :param route: (Optional) The route to use, e.g. the one pinned to the video. Picked by the pool when not given.
+        :param kwargs: Extra arguments for `requests.Session.request`.
+        :return: The response, the route it went through and the seconds until the response headers arrived.
+        :raises requests.RequestException: If the request could not be sent.
+        """
+        route = route or self.route_pool.choose()
+        failed = []
+        while True:
+            started = time.monotonic()
+            try:
+                response = route.session.request(method, url, headers=self.headers, **kwargs)
+                break
+            except requests.ConnectionError:
+                self.route_pool.record_failure(route)
+                failed.append(route)
+                route = self.route_pool.failover(failed)
+                if route is None:
+                    raise
+            except requests.RequestException:
+                self.route_pool.record_failure(route)
+                raise
 
-    def _get_video_url(self, url: str) -> str:
+        latency = time.monotonic() - started
+        if response.status_code == 429 or response.status_code >= 500:
+            self.route_pool.record_failure(route)
+        elif response.ok and not kwargs.get('stream'):
+            self.route_pool.record_success(route, latency, len(response.content))
+
+        return response, route, latency
+
+    def _get_video_url(self, url: str, route: EgressRoute | None = None) -> tuple[str, EgressRoute]:
         """
         Retrieves the direct download URL of a video from the given web page URL.
         It makes an HTTP request, searches for video URLs in the page source, cleans up
         the URL, and returns the download link.
 
         :param url: The URL of the page containing the video.
-        :return: A string with the video download URL.
+        :param route: (Optional) The route to fetch the page through.
+        :return: A string with the video download URL and the route the page was fetched through.
         :raises Exception: If there is an error fetching or processing the URL.
         """
         try:
@@ -35,7 +90,7 @@ class TikTokDownloader:
                 raise Exception("This URL contains an image, not a video")
 
             # First get the HTML page
-            response = self.session.get(url, headers=self.headers)
+            response, route, _ = self._request('GET', url, route=route)
             response.raise_for_status()
 
             # Try multiple patterns to find video URLs
@@ -56,13 +111,77 @@ class TikTokDownloader:
             # Clean up the URL (remove backslashes)
             video_url = video_urls[0].encode().decode('unicode-escape')
 
-            return video_url
+            return video_url, route
 
+        except requests.RequestException:
+            raise  # Keep the type so the caller can tell network errors from a page without a video
         except Exception as e:
             raise Exception(e)
 
+    def _resolve_video_url(self, url: str, use_cache: bool = True,
+                           route: EgressRoute | None = None) -> tuple[str, bool, EgressRoute]:
+        """
+        Gets the video download URL from the URL cache, or resolves it from the page and caches it.
+
+        :param url: The URL of the page containing the video.
+        :param use_cache: If False the page is always fetched, e.g. after the CDN rejected a cached URL.
+        :param route: (Optional) The route pinned to the video, picked by the pool when not given.
+        :return: The video download URL, whether it came from the cache and the route pinned to the video.
+        :raises Exception: If there is an error fetching or processing the URL.
+        """
+        route = route or self.route_pool.choose()
+        video_id = extract_video_id(url)
+        if use_cache and (video_url := self.url_cache.get(video_id)):
+            return video_url, True, route
+
+        video_url, route = self._get_video_url(url, route)
+        self.url_cache.put(video_id, video_url)
+        return video_url, False, route
+
+    def get_author(self, url: str, route: EgressRoute | None = None) -> str:
+        """
+        Extracts the video author from a TikTok URL, unshortening short links through the route pool.
+
+        :param url: The URL to get the author from.
+        :param route: (Optional) The route to unshorten through, picked by the pool when not given.
+        :return: Video author's name.
+        """
+        def head(head_url: str, **kwargs) -> requests.Response:
+            return self._request('HEAD', head_url, route=route, **kwargs)[0]
+
+        return extract_video_author(url, head=head)
+
+    def probe(self, url: str) -> dict[str, object]:
+        """
+        Resolves the video download URL and asks the CDN for its size without downloading the body.
+        Emits the PAGE_RESOLVED event, `download` does not emit it again for the URL returned here.
+
+        :param url: The URL of the page containing the video.
+        :return: A dictionary with the keys:
+                 - 'video_url': The resolved video download URL, or None if it could not be resolved.
+                 - 'size': The size of the video in bytes, or None if it is unknown.
+                 - 'route': The route pinned to the video, pass it on to `download`.
+        """
+        try:
+            video_url, cached, route = self._resolve_video_url(url)
+        except Exception:
+            return {'video_url': None, 'size': None, 'route': None}
+
+        self.hooks.emit(DownloadEvent.PAGE_RESOLVED, url=url, video_url=video_url, cached=cached)
+
+        try:
+            response, route, _ = self._request('HEAD', video_url, route=route, allow_redirects=True)
+            response.raise_for_status()
+            size = int(response.headers.get('content-length', 0)) or None
+        except (requests.RequestException, ValueError):
+            size = None
+
+        return {'video_url': video_url, 'size': size, 'route': route}
+
     def download(self, url: str, output_path: str, on_progress: Callable[[int, int], None] = None,
-                 chunk_size: int = 1024, delay: int = 0) -> dict[str, object]:
+                 chunk_size: int = 1024, delay: int = 0, video_url: str | None = None,
+                 rate_limiter: BandwidthLimiter | None = None, preallocate_file: bool = False,
+                 fsync: bool = False, route: EgressRoute | None = None) -> dict[str, object]:
         """
         Downloads the video from the given TikTok URL and saves it to the specified output path.
         The function optionally reports download progress through the `on_progress` callback and allows configuring
@@ -77,6 +196,19 @@ class TikTokDownloader:
                             A larger block size may increase download speed but use more memory.
         :param delay: (Optional) The delay in seconds between the request. Default is 1 second.
                       This can be used to reduce server load.
+        :param video_url: (Optional) An already resolved video download URL, e.g. from `probe`.
+                          When not given the URL cache is tried before fetching the page. A given or cached
+                          URL rejected by the CDN falls back to a fresh resolve.
+        :param rate_limiter: (Optional) A bandwidth limiter shared between transfers to cap the download rate.
+        :param preallocate_file: (Optional) Reserve the full file size up front when `content-length` is known.
+        :param fsync: (Optional) Flush the file to disk with fsync before returning.
+        :param route: (Optional) The route pinned to the video by `probe`. The page and the video are fetched
+                      through one route so cookies and IP-bound CDN signatures stay valid.
+
+        The video is written to `<output_path>.part` and only renamed onto `output_path` once every byte arrived,
+        so a file at `output_path` is always complete.
+
+        Emits the PAGE_RESOLVED, FIRST_BYTE, CHUNK_BATCH, COMPLETED and FAILED events to `self.hooks`.
 
         :return: A dictionary with keys related to the download status. The dictionary can contain:
                  - 'success': A boolean indicating the result of the download process.
@@ -85,33 +217,122 @@ class TikTokDownloader:
                  - 'author': (Optional) The videos author.
                  - 'size': (Optional) The total size of the file downloaded if the download succeeds.
                  - 'error': (Optional) An error message if the download fails.
+                 - 'retryable': (Optional) Whether the failure is transient and the download may be retried.
         """
+        body_route = None
+        part_path = f"{output_path}.part"
         try:
+            started = time.monotonic()
+
             # Get video download URL
-            video_url = self._get_video_url(url)
-            author = extract_video_author(url)
+            # A URL resolved earlier, by `probe` or from the cache, may have expired while waiting its turn
+            resolved_earlier = video_url is not None
+            route = route or self.route_pool.choose()
+            if video_url is None:
+                video_url, resolved_earlier, route = self._resolve_video_url(url, route=route)
+                self.hooks.emit(DownloadEvent.PAGE_RESOLVED, url=url, video_url=video_url, cached=resolved_earlier)
+            author = self.get_author(url, route)
 
             # Add delay to avoid rate limiting
             time.sleep(delay)
 
             # Download video with proper headers
-            response = self.session.get(video_url, headers=self.headers, stream=True)
+            response, route, latency = self._request('GET', video_url, route=route, stream=True)
+
+            # The signature of an earlier URL can expire or be revoked, resolve the page again once
+            if resolved_earlier and not response.ok:
+                response.close()
+                self.url_cache.invalidate(extract_video_id(url))
+                video_url, _, route = self._resolve_video_url(url, use_cache=False, route=route)
+                self.hooks.emit(DownloadEvent.PAGE_RESOLVED, url=url, video_url=video_url, cached=False)
+                response, route, latency = self._request('GET', video_url, route=route, stream=True)
+
             response.raise_for_status()
+            body_route = route
+            body_started = time.monotonic()
 
             # Save video
             total_size = int(response.headers.get('content-length', 0))
             bytes_downloaded = 0
 
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        bytes_downloaded += len(chunk)
+            # Resolve the hook lookups once so the chunk loop stays cheap without listeners
+            emit_chunks = self.hooks.has(DownloadEvent.CHUNK_BATCH)
+            chunk_batch_size = self.hooks.chunk_batch_size
+            chunks = 0
 
-                        if on_progress and total_size:
-                            on_progress(bytes_downloaded, total_size)
+            with open(part_path, 'wb') as f:
+                preallocated = preallocate_file and preallocate(f, total_size)
+                try:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            if not bytes_downloaded:
+                                self.hooks.emit(DownloadEvent.FIRST_BYTE, url=url, size=total_size,
+                                                elapsed=time.monotonic() - started)
 
-            return {'success': True, 'path': output_path, 'size': total_size, 'url': url, 'author': author}
+                            f.write(chunk)
+                            bytes_downloaded += len(chunk)
+
+                            if emit_chunks:
+                                chunks += 1
+                                if chunks % chunk_batch_size == 0:
+                                    self.hooks.emit(DownloadEvent.CHUNK_BATCH, url=url, bytes=bytes_downloaded,
+                                                    size=total_size)
+
+                            if rate_limiter:
+                                rate_limiter.consume(len(chunk))
+
+                            if on_progress and total_size:
+                                on_progress(bytes_downloaded, total_size)
+                finally:
+                    # Drop the reserved space that was never written so a short transfer stays short on disk
+                    if preallocated:
+                        f.truncate(bytes_downloaded)
+
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            if total_size and bytes_downloaded != total_size:
+                self.route_pool.record_failure(body_route)
+                body_route = None
+                raise IncompleteDownloadError(f"Incomplete download: received {bytes_downloaded} of {total_size} bytes")
+
+            os.replace(part_path, output_path)
+            if fsync:
+                fsync_directory(os.path.dirname(output_path) or '.')
+
+            self.route_pool.record_success(body_route, latency, bytes_downloaded, time.monotonic() - body_started)
+
+            self.hooks.emit(DownloadEvent.COMPLETED, url=url, path=output_path, bytes=bytes_downloaded,
+                            size=total_size, elapsed=time.monotonic() - started)
+            return {'success': True, 'path': output_path, 'size': total_size or bytes_downloaded, 'url': url,
+                    'author': author}
 
         except Exception as e:
-            return {'success': False, 'error': str(e), 'url': url}
+            # The connection dropped mid transfer, hold it against the route that carried it
+            if body_route and isinstance(e, requests.RequestException):
+                self.route_pool.record_failure(body_route)
+            # Never leave a partial video behind, the pending index entry keeps its URL for a re-download
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            self.hooks.emit(DownloadEvent.FAILED, url=url, error=str(e))
+            return {'success': False, 'error': str(e), 'url': url, 'retryable': self._is_transient(e)}
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """
+        Checks whether a failed download may succeed when retried.
+        Network errors, 429 and 5xx responses and cut off transfers are transient, other 4xx responses,
+        image posts and pages without a video are not.
+
+        :param error: The error the download failed with.
+        :return: True if retrying the download makes sense.
+        """
+        if isinstance(error, IncompleteDownloadError):
+            return True
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            return status == 429 or status >= 500
+        return isinstance(error, requests.RequestException)
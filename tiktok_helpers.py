@@ -1,19 +1,22 @@
 import re
-import requests
+from typing import Callable
 from urllib.parse import urlparse
 
+import requests
+
 
-def unshorten_url(url: str) -> str:
+def unshorten_url(url: str, head: Callable[..., requests.Response] = requests.head) -> str:
     """
     Unshortens a TikTok URL (e.g., tiktok.com/t/...) to get the full URL with author info.
     :param url: The URL to unshorten
+    :param head: The function that sends the HEAD request, e.g. to send it through a route pool
     :return: The full unshortened URL, or the original URL if unshortening fails or is not needed
     """
     # Check if this is a shortened URL pattern (tiktok.com/t/...)
     if re.search(r'tiktok\.com/t/', url):
         try:
             # Use HEAD request to follow redirects without downloading content
-            response = requests.head(url, allow_redirects=True, timeout=10)
+            response = head(url, allow_redirects=True, timeout=10)
             return response.url
         except requests.RequestException:
             # If unshortening fails, return the original URL
@@ -34,14 +37,15 @@ def extract_video_id(url: str) -> str:
     return path.split('/')[-1]
 
 
-def extract_video_author(url: str) -> str:
+def extract_video_author(url: str, head: Callable[..., requests.Response] = requests.head) -> str:
     """
     Extracts the video author from a TikTok URL.
     :param url: The URL to get the author from
+    :param head: The function that sends the HEAD request used to unshorten the URL
     :return: Video author's name
     """
     # Unshorten the URL first if it's a shortened link
-    full_url = unshorten_url(url)
+    full_url = unshorten_url(url, head)
 
     # Use regex to capture the username in the URL
     match = re.search(r"@([a-zA-Z0-9_]+)", full_url)
@@ -0,0 +1,124 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# Query parameters TikTok's CDNs use for the expiry of a signed URL, as a unix timestamp
+EXPIRY_PARAMS = ('x-expires', 'expire', 'expires')
+
+
+def url_expiry(video_url: str) -> float | None:
+    """
+    Reads the expiry embedded in a signed CDN URL.
+    :param video_url: The video download URL
+    :return: The expiry as a unix timestamp, or None if the URL does not carry one
+    """
+    query = parse_qs(urlparse(video_url).query)
+    for param in EXPIRY_PARAMS:
+        try:
+            return float(query[param][0])
+        except (KeyError, IndexError, ValueError):
+            continue
+    return None
+
+
+class ResolvedURLCache:
+    """Least recently used cache of resolved video download URLs keyed by video ID, honoring their expiry."""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300, margin: float = 30,
+                 path: str | None = None):
+        """
+        :param max_entries: The number of URLs kept before the least recently used one is evicted
+        :param default_ttl: How long in seconds a URL without an embedded expiry is kept
+        :param margin: URLs are treated as expired this many seconds early so a transfer does not start on a dying URL
+        :param path: If provided the cache is loaded from and saved to this JSON file
+        """
+        self.max_entries = max(1, max_entries)
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self.path = path
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, video_id: str) -> str | None:
+        """
+        Gets the cached download URL of a video.
+        :param video_id: The TikTok video ID
+        :return: The download URL, or None if it is not cached or has expired
+        """
+        entry = self._entries.get(video_id)
+        if entry is None:
+            return None
+
+        video_url, expires_at = entry
+        if expires_at - self.margin <= time.time():
+            del self._entries[video_id]
+            return None
+
+        self._entries.move_to_end(video_id)
+        return video_url
+
+    def put(self, video_id: str, video_url: str) -> None:
+        """
+        Caches the download URL of a video until the expiry embedded in it, or the default TTL.
+        :param video_id: The TikTok video ID
+        :param video_url: The resolved download URL
+        """
+        expires_at = url_expiry(video_url) or time.time() + self.default_ttl
+        self._entries[video_id] = (video_url, expires_at)
+        self._entries.move_to_end(video_id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, video_id: str) -> None:
+        """
+        Drops the cached URL of a video, e.g. after the CDN rejected it.
+        :param video_id: The TikTok video ID
+        """
+        self._entries.pop(video_id, None)
+
+    def load(self) -> None:
+        """Loads the unexpired entries from the backing file, ignoring a missing or corrupt file."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):  # ValueError covers invalid JSON and invalid UTF-8
+            return
+
+        if not isinstance(entries, dict):
+            return
+
+        now = time.time()
+        valid = []
+        for video_id, entry in entries.items():
+            # Skip entries that do not look like [video_url, expires_at] instead of failing the whole load
+            if not (isinstance(entry, list) and len(entry) == 2 and isinstance(entry[0], str)
+                    and isinstance(entry[1], (int, float)) and not isinstance(entry[1], bool)):
+                continue
+            if entry[1] - self.margin > now:
+                valid.append((video_id, entry[0], float(entry[1])))
+
+        for video_id, video_url, expires_at in sorted(valid, key=lambda item: item[2]):
+            self._entries[video_id] = (video_url, expires_at)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        """Writes the unexpired entries to the backing file, if there is one."""
+        if not self.path:
+            return
+
+        now = time.time()
+        entries = {video_id: [video_url, expires_at] for video_id, (video_url, expires_at) in self._entries.items()
+                   if expires_at - self.margin > now}
+
+        # Write to a temporary file first so an interrupted save never leaves a torn cache behind
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, self.path)
@@ -92,18 +92,19 @@ class SafeFormatter(string.Formatter):
         return super().format_field(value, format_spec)
 
 
-def parse_filename_template(index: int, url: str, template: str) -> str:
+def parse_filename_template(index: int, url: str, template: str, author: str | None = None) -> str:
     """
     Fill a filename template using metadata, with support for default and custom datetime formats.
     :param index: The index of the current download
     :param url: The url that is being parsed from
     :param template: The file name template
+    :param author: The video author, extracted from the URL when not given
     :return: Parsed string
     """
 
     placeholders = {
         "index": index,
-        "author": extract_video_author(url),
+        "author": author or extract_video_author(url),
         "id": extract_video_id(url),
         "cdate": datetime.datetime.now()
     }